@@ -0,0 +1,267 @@
+"""Shared data layer for the ISS dashboard pages.
+
+Keeping the session, fetchers, caches and map renderer in one module
+means every entrypoint that imports it shares a single pooled client,
+one set of st.cache_data entries and one compiled bytecode, instead of
+each page carrying its own copy.
+"""
+
+import streamlit as st
+import httpx
+import orjson
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import TimeoutError as FutureTimeoutError
+import threading
+import time
+
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+
+# --- Shared HTTP Client ---
+
+# One pooled HTTP/2-capable client for the whole module: concurrent
+# fetches to the same origin multiplex over a single TLS session instead
+# of opening a socket each (open-notify.org is HTTP/1.1-only and falls
+# back to plain keep-alive reuse there). The transport retries connect
+# failures, and the split connect=2s timeout makes a stuck DNS lookup or
+# SYN fail fast instead of eating the budget before the fallback fires.
+CLIENT = httpx.Client(
+    transport=httpx.HTTPTransport(
+        http2=True,
+        retries=2,
+        limits=httpx.Limits(max_keepalive_connections=10, max_connections=20),
+    ),
+    timeout=httpx.Timeout(5.0, connect=2.0),
+    headers={
+        "Accept": "application/json",
+        "Accept-Encoding": "gzip",
+    },
+)
+
+# --- API Functions with Fallback ---
+
+# The raw fetchers below run inside worker threads, so they stay free of
+# st.* calls and report status through their return values instead.
+
+def _parse_open_notify(data):
+    """Parses an open-notify iss-now payload into (lat, lon)."""
+    if data.get('message') != 'success':
+        raise ValueError("open-notify reported failure")
+    return float(data['iss_position']['latitude']), float(data['iss_position']['longitude'])
+
+def _parse_wheretheiss(data):
+    """Parses a wheretheiss.at satellite payload into (lat, lon)."""
+    return float(data['latitude']), float(data['longitude'])
+
+# Position APIs in preference order as a cache-warm (url, parser)
+# constant: nothing is allocated or looked up per call, and adding an
+# API is a one-line change.
+_APIS = (
+    ("http://api.open-notify.org/iss-now.json", _parse_open_notify),
+    ("https://api.wheretheiss.at/v1/satellites/25544", _parse_wheretheiss),
+)
+
+# How long the primary API gets to itself before the fallback is raced.
+_HEDGE_DELAY = 0.8
+
+def _fetch_and_parse_position(api_url, parser, source):
+    """Fetches one position API and returns (lat, lon, source); raises on any failure."""
+    response = CLIENT.get(api_url)
+    response.raise_for_status()
+    lat, lon = parser(orjson.loads(response.content))
+    return lat, lon, source
+
+def _fetch_iss_position():
+    """Fetches the ISS position as (lat, lon, source) with a hedged API race.
+
+    The primary API is started first; if it hasn't answered within
+    _HEDGE_DELAY seconds the fallbacks are fired in parallel and whichever
+    returns a valid position first wins. Worst case is the fastest try
+    rather than the sum of sequential timeouts. ``source`` is one of
+    "primary", "fallback" or "demo" so the UI can show connectivity
+    without a separate network probe.
+    """
+    primary_url, primary_parse = _APIS[0]
+    pool = ThreadPoolExecutor(max_workers=len(_APIS))
+    try:
+        futures = [pool.submit(_fetch_and_parse_position,
+                               primary_url, primary_parse, "primary")]
+        try:
+            return futures[0].result(timeout=_HEDGE_DELAY)
+        except FutureTimeoutError:
+            # Primary is slow but may still succeed: race the fallbacks.
+            futures.extend(pool.submit(_fetch_and_parse_position, url, parse, "fallback")
+                           for url, parse in _APIS[1:])
+        except Exception:
+            # Primary failed outright: only the fallbacks are left.
+            futures = [pool.submit(_fetch_and_parse_position, url, parse, "fallback")
+                       for url, parse in _APIS[1:]]
+
+        for future in as_completed(futures):
+            try:
+                position = future.result()
+            except Exception:
+                continue
+            for loser in futures:
+                loser.cancel()
+            return position
+    finally:
+        # Don't block on a straggler that already lost the race.
+        pool.shutdown(wait=False)
+
+    # If all APIs fail, return demo coordinates
+    return 28.6139, 77.2090, "demo"  # Demo coordinates (Delhi, India)
+
+def _fetch_astronauts():
+    """Fetches the list of astronauts with fallback data."""
+    try:
+        response = CLIENT.get("http://api.open-notify.org/astros.json")
+        response.raise_for_status()
+        data = orjson.loads(response.content)
+        if data.get('message') == 'success':
+            return data['number'], data['people']
+    except (httpx.HTTPError, orjson.JSONDecodeError):
+        pass
+
+    # Fallback demo data
+    demo_astronauts = [
+        {"name": "Demo Astronaut 1", "craft": "ISS"},
+        {"name": "Demo Astronaut 2", "craft": "ISS"},
+        {"name": "Demo Astronaut 3", "craft": "ISS"}
+    ]
+    return len(demo_astronauts), demo_astronauts
+
+def check_network():
+    """Probes an external endpoint and returns its status code, or None when offline."""
+    try:
+        return CLIENT.get("https://httpbin.org/status/200").status_code
+    except httpx.HTTPError:
+        return None
+
+@st.cache_data(persist="disk")
+def fetch_all():
+    """Fetches position and crew concurrently.
+
+    The two calls are independent and network-bound, so fanning them out
+    over a thread pool makes a cache miss cost max(RTT) instead of sum(RTT);
+    with HTTP/2 they share one multiplexed connection per origin. The disk
+    persistence keeps the last result across process restarts so a fresh
+    deploy doesn't cold-fetch — but Streamlit ignores ttl when persist is
+    on, so the payload carries its own fetch timestamp and freshness is
+    enforced by the stale-while-revalidate layer below.
+    """
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        position = pool.submit(_fetch_iss_position)
+        astronauts = pool.submit(_fetch_astronauts)
+        return {
+            "position": position.result(),
+            "astronauts": astronauts.result(),
+            "fetched_at": time.time(),
+        }
+
+# --- Stale-While-Revalidate Caching ---
+
+# A hard TTL makes the first request after expiry pay the full API
+# latency. Instead we serve the session-state value immediately and,
+# once it nears its freshness window, kick off a daemon-thread refetch
+# so the *next* rerun sees fresh data with no user-visible wait.
+
+_REFRESH_LOCK = threading.Lock()
+
+def _refresh_entry(key, fetcher):
+    """Background worker: refetches and swaps the session-state entry in place."""
+    try:
+        value = fetcher()
+    except Exception:
+        value = None
+    with _REFRESH_LOCK:
+        entry = st.session_state.get(key)
+        if value is not None:
+            st.session_state[key] = {"value": value, "ts": time.time(), "refreshing": False}
+        elif entry is not None:
+            entry["refreshing"] = False
+
+def _prime_session_cache():
+    """Fills both data entries from a single concurrent fetch on first access.
+
+    The entries are stamped with the payload's own fetch time, not the
+    restore time: a snapshot restored from the disk cache after a restart
+    may be arbitrarily old, and an honest ts makes the staleness check
+    fire a background refresh on the very first access instead of
+    presenting the snapshot as fresh for a full window.
+    """
+    data = fetch_all()
+    fetched_at = data["fetched_at"]
+    st.session_state.setdefault(
+        "iss_position", {"value": data["position"], "ts": fetched_at, "refreshing": False})
+    st.session_state.setdefault(
+        "astronauts", {"value": data["astronauts"], "ts": fetched_at, "refreshing": False})
+
+def _get_with_background_refresh(key, fetcher, stale_after):
+    """Serves the cached value immediately, refreshing in the background when old."""
+    if key not in st.session_state:
+        _prime_session_cache()
+    entry = st.session_state[key]
+    with _REFRESH_LOCK:
+        if time.time() - entry["ts"] > stale_after and not entry["refreshing"]:
+            entry["refreshing"] = True
+            worker = threading.Thread(target=_refresh_entry, args=(key, fetcher), daemon=True)
+            # The worker touches session_state, so it needs the script-run context.
+            add_script_run_ctx(worker, get_script_run_ctx())
+            worker.start()
+    return entry["value"]
+
+def get_iss_position():
+    """Returns the current (lat, lon, source) of the ISS."""
+    return _get_with_background_refresh("iss_position", _fetch_iss_position, stale_after=55)
+
+def get_astronauts():
+    """Returns (count, people) for the current crew."""
+    return _get_with_background_refresh("astronauts", _fetch_astronauts, stale_after=3300)
+
+def invalidate_live_data():
+    """Drops only the position/crew caches so the next access refetches.
+
+    Deliberately narrower than st.cache_data.clear(): the rendered map
+    HTML, crew DataFrame and static chrome stay warm; only the network
+    data is stale and worth refetching.
+    """
+    fetch_all.clear()
+    st.session_state.pop("iss_position", None)
+    st.session_state.pop("astronauts", None)
+
+# --- Crew Table ---
+
+@st.cache_data
+def build_crew_df(people_key):
+    """Builds the renamed crew DataFrame from a tuple of (name, craft) pairs.
+
+    Keyed on the hashable tuple so an unchanged crew list reuses the cached
+    frame instead of reconstructing it on every rerun.
+    """
+    import pandas as pd  # deferred: pandas pulls in numpy on import
+
+    df = pd.DataFrame(people_key, columns=['name', 'craft'])
+    df.rename(columns={'name': 'Name', 'craft': 'Spacecraft'}, inplace=True)
+    return df
+
+# --- Map Rendering ---
+
+@st.cache_data(ttl=60, max_entries=128)
+def render_iss_map_html(lat_r, lon_r):
+    """Builds the Folium map for a rounded (lat, lon) and returns its HTML.
+
+    Serializing the Leaflet bundle is the dominant CPU cost of a rerun,
+    so the rendered HTML is cached keyed on coordinates rounded to 2 dp;
+    identical positions reuse the prebuilt blob.
+    """
+    import folium  # deferred: folium pulls in jinja2 and branca on import
+
+    m = folium.Map(location=[lat_r, lon_r], zoom_start=3)
+    tooltip = f"ISS Position: ({lat_r:.2f}, {lon_r:.2f})"
+    folium.Marker(
+        [lat_r, lon_r],
+        popup=f"<b>ISS</b><br>Lat: {lat_r:.4f}<br>Lon: {lon_r:.4f}",
+        tooltip=tooltip,
+        icon=folium.Icon(icon='rocket', prefix='fa', color='red')
+    ).add_to(m)
+    return m.get_root().render()
@@ -1,10 +1,7 @@
 import streamlit as st
-import requests
-import pandas as pd
-import folium
-from streamlit_folium import st_folium
-from datetime import datetime
-import time
+import streamlit.components.v1 as components
+
+import iss_core
 
 # Set page configuration
 st.set_page_config(
@@ -13,133 +10,110 @@ st.set_page_config(
     layout="wide"
 )
 
-# --- API Functions with Fallback ---
-
-@st.cache_data(ttl=60)
-def get_iss_position():
-    """Fetches the current position of the ISS with multiple API fallbacks."""
-    apis = [
-        "http://api.open-notify.org/iss-now.json",
-        "https://api.wheretheiss.at/v1/satellites/25544",
-        "https://api.n2yo.com/rest/v1/satellite/positions/25544/0/0/0/1/&apiKey=demo"
-    ]
-    
-    for api_url in apis:
-        try:
-            response = requests.get(api_url, timeout=10)
-            response.raise_for_status()
-            data = response.json()
-            
-            # Handle different API response formats
-            if api_url.startswith("http://api.open-notify.org"):
-                if data.get('message') == 'success':
-                    lat = float(data['iss_position']['latitude'])
-                    lon = float(data['iss_position']['longitude'])
-                    return lat, lon
-            elif api_url.startswith("https://api.wheretheiss.at"):
-                lat = float(data['latitude'])
-                lon = float(data['longitude'])
-                return lat, lon
-                
-        except requests.exceptions.RequestException as e:
-            st.warning(f"API {api_url} failed: {e}")
-            continue
-        except (KeyError, ValueError) as e:
-            st.warning(f"Invalid response from {api_url}: {e}")
-            continue
-    
-    # If all APIs fail, return demo coordinates
-    st.error("All ISS position APIs are unavailable. Showing demo position.")
-    return 28.6139, 77.2090  # Demo coordinates (Delhi, India)
-
-@st.cache_data(ttl=3600)
-def get_astronauts():
-    """Fetches the list of astronauts with fallback data."""
-    try:
-        response = requests.get("http://api.open-notify.org/astros.json", timeout=10)
-        response.raise_for_status()
-        data = response.json()
-        if data.get('message') == 'success':
-            return data['number'], data['people']
-    except requests.exceptions.RequestException as e:
-        st.warning(f"Error fetching astronaut data: {e}")
-        
-    # Fallback demo data
-    st.info("Using demo astronaut data due to API unavailability.")
-    demo_astronauts = [
-        {"name": "Demo Astronaut 1", "craft": "ISS"},
-        {"name": "Demo Astronaut 2", "craft": "ISS"},
-        {"name": "Demo Astronaut 3", "craft": "ISS"}
-    ]
-    return len(demo_astronauts), demo_astronauts
-
 # --- Dashboard UI ---
 
 st.title("🛰️ Real-Time ISS Dashboard")
 st.markdown("This dashboard tracks the International Space Station's current position and crew.")
 
-# Add network status indicator
-with st.container():
-    try:
-        test_response = requests.get("https://httpbin.org/status/200", timeout=3)
-        if test_response.status_code == 200:
+auto_refresh = st.sidebar.checkbox("🔄 Auto-refresh (10s)", value=True)
+
+# Connectivity probe against a third-party host, off the critical path:
+# it only runs when explicitly requested from the sidebar.
+with st.sidebar.expander("🔧 Diagnostics"):
+    if st.checkbox("Run connectivity probe"):
+        probe_status = iss_core.check_network()
+        if probe_status == 200:
             st.success("✅ Network connection active")
-        else:
+        elif probe_status is not None:
             st.warning("⚠️ Network issues detected")
-    except:
-        st.error("❌ No internet connection - Try refreshing or check your internet connection")
+        else:
+            st.error("❌ No internet connection")
 
-# --- Live Data Metrics ---
-lat, lon = get_iss_position()
-num_astros, astros_list = get_astronauts()
+# --- Live Position Fragment ---
 
-col1, col2, col3 = st.columns(3)
-with col1:
-    st.metric("Latitude", f"{lat:.4f}°" if lat is not None else "N/A")
-with col2:
-    st.metric("Longitude", f"{lon:.4f}°" if lon is not None else "N/A")
-with col3:
-    st.metric("Astronauts Onboard", num_astros)
+# Only this subtree reruns on the refresh tick; the crew panel, network
+# status and footer are untouched, so the front end has far less to diff.
+@st.fragment(run_every="10s" if auto_refresh else None)
+def live_position_block():
+    lat, lon, source = iss_core.get_iss_position()
+    num_astros, _ = iss_core.get_astronauts()
 
-# --- Main Layout with Map and Info ---
-map_col, info_col = st.columns([2, 1])
+    # Status falls out of the position fetch itself: real coordinates mean
+    # the network is up, no extra probe needed.
+    if source == "demo":
+        st.error("❌ All position APIs unavailable — showing demo position. "
+                 "Try refreshing or check your internet connection")
+    elif source == "fallback":
+        st.warning("⚠️ Primary position API unavailable — using fallback source")
+    else:
+        st.success("✅ Live position from primary API")
+
+    # One markdown emit instead of three st.columns/st.metric widgets:
+    # a single message and DOM node for the front end to diff per tick.
+    metrics_html = (
+        "<div style='display: flex; gap: 24px;'>"
+        f"<div><small>Latitude</small><h3>{f'{lat:.4f}°' if lat is not None else 'N/A'}</h3></div>"
+        f"<div><small>Longitude</small><h3>{f'{lon:.4f}°' if lon is not None else 'N/A'}</h3></div>"
+        f"<div><small>Astronauts Onboard</small><h3>{num_astros}</h3></div>"
+        "</div>"
+    )
+    st.markdown(metrics_html, unsafe_allow_html=True)
 
-with map_col:
     st.header("Live Ground Track")
     if lat is not None and lon is not None:
-        m = folium.Map(location=[lat, lon], zoom_start=3)
-        tooltip = f"ISS Position: ({lat:.2f}, {lon:.2f})"
-        folium.Marker(
-            [lat, lon], 
-            popup=f"<b>ISS</b><br>Lat: {lat:.4f}<br>Lon: {lon:.4f}", 
-            tooltip=tooltip,
-            icon=folium.Icon(icon='rocket', prefix='fa', color='red')
-        ).add_to(m)
-        st_folium(m, use_container_width=True, height=500)
+        # Default to st.map: it rides the pydeck/WebGL layer Streamlit
+        # already ships, so no separate Leaflet bundle goes to the browser.
+        detailed_map = st.checkbox("🗺️ Detailed map (Leaflet)", value=False)
+        if detailed_map:
+            # One-way embed: no streamlit-folium return channel to serialize.
+            components.html(iss_core.render_iss_map_html(round(lat, 2), round(lon, 2)),
+                            height=500, scrolling=False)
+        else:
+            import pandas as pd  # deferred: only needed for the marker frame
+
+            st.map(pd.DataFrame({"lat": [lat], "lon": [lon]}),
+                   zoom=2, size=20, color="#ff0000")
     else:
         st.warning("Could not display map. Position data is unavailable.")
 
+# --- Main Layout with Map and Info ---
+map_col, info_col = st.columns([2, 1])
+
+with map_col:
+    live_position_block()
+
 with info_col:
     st.header("👨‍🚀 Current Crew")
-    
+
     if st.button("🔄 Refresh Data"):
-        st.cache_data.clear()
+        iss_core.invalidate_live_data()
         st.rerun()
 
+    _, astros_list = iss_core.get_astronauts()
     if astros_list:
-        df = pd.DataFrame(astros_list)
-        df.rename(columns={'name': 'Name', 'craft': 'Spacecraft'}, inplace=True)
+        df = iss_core.build_crew_df(tuple((p['name'], p['craft']) for p in astros_list))
         st.dataframe(df, use_container_width=True, hide_index=True, height=None)
     else:
         st.info("Astronaut data is currently unavailable.")
 
 
 # --- Footer ---
-st.markdown("---")
-st.markdown(
-    "<div style='display: flex; flex-direction: row; justify-content: space-between; color: #888; font-size: 0.8em; padding: 10px;'>"
-    "<p>Made by Soumitra Kumar</p>"
-    "<p>Network issues? Try refreshing or check your internet connection</p>"
-    "</div>",
-    unsafe_allow_html=True
-)
+
+@st.cache_data
+def _footer_html():
+    """Returns the static footer markup; built once, served from cache."""
+    return (
+        "<hr/>"
+        "<div style='display: flex; flex-direction: row; justify-content: space-between; color: #888; font-size: 0.8em; padding: 10px;'>"
+        "<p>Made by Soumitra Kumar</p>"
+        "<p>Network issues? Try refreshing or check your internet connection</p>"
+        "</div>"
+    )
+
+# Emitting the static chrome from its own fragment keeps it a single
+# message the front end never has to re-diff on live-position ticks.
+@st.fragment
+def static_chrome():
+    st.markdown(_footer_html(), unsafe_allow_html=True)
+
+static_chrome()